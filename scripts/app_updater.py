@@ -1,13 +1,24 @@
 import requests
-from bs4 import BeautifulSoup
+import lxml.html
+import lxml.etree
 import re
 import json
+import string
+import functools
 import os
+import time
+import gzip
+import hashlib
 from packaging.version import parse, InvalidVersion
 from urllib.parse import urljoin, urlparse, unquote
 import logging
-import time
 import sys
+import queue
+import threading
+import contextlib
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 
 # Selenium imports
 from selenium import webdriver
@@ -17,17 +28,47 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+
+try:
+    import ahocorasick # Optional: faster multi-keyword variant detection
+except ImportError:
+    ahocorasick = None
+try:
+    import orjson # Optional: faster JSON (de)serialization
+except ImportError:
+    orjson = None
 
 URL_FILE = "urls_to_check.txt"
 TRACKING_FILE = "versions_tracker.json"
 OUTPUT_JSON_FILE = "updates_found.json"
+PAGE_CACHE_DIR = os.getenv('PAGE_CACHE_DIR', "page_cache") # Last fetched HTML per URL, revalidated with ETag/Last-Modified
+PAGE_CACHE_INDEX = os.path.join(PAGE_CACHE_DIR, "index.json")
 GITHUB_OUTPUT_FILE = os.getenv('GITHUB_OUTPUT', 'local_github_output.txt')
+PRETTY_JSON = bool(os.getenv('DEBUG')) # Indented JSON output only when debugging
+MAX_DRIVERS = 3 # Upper bound on concurrent Chrome instances
+MAX_WORKERS = 8 # URLs checked concurrently; only those needing Selenium compete for drivers
+LINKS_GRACE_SECONDS = 0.5 # Extra wait only when the download links never showed up
+DOWNLOAD_LINK_SELECTOR = "section.downloadbox ul.download-links li.download-link a.download-btn"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36"
+
+# Shared HTTP session: keep-alive and connection pooling across all URLs
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': USER_AGENT})
+# Pool comfortably above MAX_WORKERS; transient gateway errors are retried with backoff on the same pool
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504)))
+SESSION.mount('https://', _HTTP_ADAPTER)
+SESSION.mount('http://', _HTTP_ADAPTER)
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG if os.getenv('DEBUG') else logging.INFO) # DEBUG adds per-link details, without third-party debug noise
 
+# A stricter "\d+(?:\.\d+){1,2}" variant used to follow here; every match of it is also a match
+# of this pattern at the same position, so it could never be the first to match.
 VERSION_REGEX_PATTERNS = [
     r'(?<![\w.-])(?:[vV])?(\d+(?:\.\d+){1,3}(?:(?:[-._]?[a-zA-Z0-9]+)+)?)(?![.\w])',
-    r'(?<![\w.-])(?:[vV])?(\d+(?:\.\d+){1,2})(?![.\w])',
 ]
 VERSION_PATTERNS_FOR_CLEANING = [
     r'\s*[vV]?\d+(?:\.\d+){1,3}(?:(?:[-._]?[a-zA-Z0-9]+)+)?\b',
@@ -70,98 +111,301 @@ COMMON_VARIANT_KEYWORDS_TO_DETECT_AND_CLEAN = [
     "Font", "فونت"
 ]
 
+# Pre-compiled patterns (compiled once at import instead of on every call)
+_VERSION_REGEXES = [re.compile(p) for p in VERSION_REGEX_PATTERNS]
+_VERSION_FALLBACK_RE = re.compile(r'(\d+\.\d+(?:\.\d+){0,2}(?:[.-]?[a-zA-Z0-9]+)*)')
+_VERSION_CLEAN_REGEXES = [re.compile(p, re.IGNORECASE) for p in VERSION_PATTERNS_FOR_CLEANING]
+_VERSION_CLEAN_ENDS = [re.compile(p + r'$', re.IGNORECASE) for p in VERSION_PATTERNS_FOR_CLEANING]
+_SITE_SUFFIX = re.compile(r'\s*\((?:www\.)?farsroid\.com.*?\)\s*$', re.IGNORECASE)
+_SITE_SUFFIX_ANYWHERE = re.compile(r'\s*\((?:www\.)?farsroid\.com.*?\)\s*', re.IGNORECASE)
+_FARSROID_DASH_SUFFIX = re.compile(r'\s*[-–—]\s*Farsroid\s*$', re.IGNORECASE)
+# "- فارسروید" / "- دانلود ..." site suffix or "– اپلیکیشن ..." tail of <title>, in one pass
+_TITLE_SUFFIX = re.compile(r'\s*(?:[-|–—]\s*(?:فارسروید|دانلود.*)|–\s*اپلیکیشن.*)$', re.IGNORECASE)
+_H1_TITLE_CLASS = re.compile(r'title', re.IGNORECASE)
+_LINK_BOILERPLATE = re.compile(r'\(farsroid\.com\)|دانلود فایل نصبی|برنامه با لینک مستقیم')
+_LINK_NOISE = re.compile(r'\b(?:با لینک مستقیم|مگابایت|\d+)\b', re.IGNORECASE)
+_WS = re.compile(r'\s+')
+_UNDERSCORES = re.compile(r'[-_]+')
+_MULTI_UNDERSCORE = re.compile(r'_+')
+_TRACKING_ID_KEEP = frozenset(string.ascii_lowercase + string.digits + '-_')
+_TRACKING_ID_TRANSLATE = {i: None for i in range(128) if chr(i) not in _TRACKING_ID_KEEP}
+_TRACKING_ID_TRANSLATE.update({ord('–'): '-', ord('—'): '-'})
+known_extensions_regex = r'\.(apk|zip|exe|rar|xapk|apks|msi|dmg|pkg|deb|rpm|appimage|tar\.gz|tgz|tar\.bz2|tbz2|tar\.xz|txz|7z|gz|bz2|xz|jpg|jpeg|png|gif|bmp|tiff|tif|webp|svg|ico|mp3|wav|ogg|aac|flac|m4a|wma|mp4|mkv|avi|mov|wmv|flv|webm|mpeg|mpg|txt|pdf|doc|docx|xls|xlsx|ppt|pptx|odt|ods|odp|rtf|csv|html|htm|xml|json|md|ttf|otf|woff|woff2|eot)$'
+_EXT_RE = re.compile(known_extensions_regex, re.IGNORECASE)
+_DOUBLE_EXTS = (".tar.gz", ".tar.bz2", ".tar.xz")
+_KNOWN_EXTS = frozenset([
+    '.apk', '.zip', '.exe', '.rar', '.xapk', '.apks', '.7z', '.gz', '.bz2', '.xz',
+    '.msi', '.dmg', '.pkg', '.deb', '.rpm', '.appimage',
+    '.tgz', '.tbz2', '.txz', 
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp', '.svg', '.ico',
+    '.mp3', '.wav', '.ogg', '.aac', '.flac', '.m4a', '.wma',
+    '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mpeg', '.mpg',
+    '.txt', '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', 
+    '.odt', '.ods', '.odp', '.rtf', '.csv', '.html', '.htm', '.xml', '.json', '.md',
+    '.ttf', '.otf', '.woff', '.woff2', '.eot'
+])
+_FILENAME_TRANSLATE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+_GENERIC_TRACKING_SUFFIXES = ('_default', '_archive', '_image', '_audio', '_video', '_document', '_font', '_universal')
+_GENERIC_URL_TERMS = re.compile(r'\b(دانلود|Download|برنامه|App|Apk|Farsroid|Android)\b', re.IGNORECASE)
+
+# All variant keywords stripped from tracking names, fused into one alternation.
+# Longest-first ordering keeps e.g. "Mod-Extra" ahead of "Mod" at the same position.
+AGGRESSIVE_CLEAN_KEYWORDS = COMMON_VARIANT_KEYWORDS_TO_DETECT_AND_CLEAN + \
+                            ["PC", "کامپیوتر", "ویندوز", "Windows", "Lite", "لایت", "Pro", "پرو"]
+_VARIANT_STRIP_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(k) for k in sorted(set(AGGRESSIVE_CLEAN_KEYWORDS), key=len, reverse=True)) + r')\b',
+    re.IGNORECASE)
+
+# Variant keys (in display/precedence order) and the lowercased link patterns that detect them
+VARIANT_KEYWORDS_ORDERED = (
+    ("Mod-Extra", ("mod-extra", "مود اکسترا")), ("Mod-Lite", ("mod-lite", "مود لایت")),
+    ("Ad-Free", ("ad-free", "بدون تبلیغات")), ("Unlocked", ("unlocked", "آنلاک")), ("Patched", ("patched", "پچ شده")),
+    ("Premium", ("premium", "پرمیوم")), ("Ultra", ("ultra", "اولترا")), ("Clone", ("clone", "کلون")),
+    ("Beta", ("beta", "بتا")), ("Full", ("full", "کامل")), ("Lite", ("lite", "لایت")), ("Main", ("main",)),
+    ("Pro", ("pro", "پرو")), ("VIP", ("vip",)), ("Plus", ("plus", "پلاس")),
+    ("Persian", ("persian", "فارسی")), ("English", ("english", "انگلیسی")),
+    ("Arm64-v8a", ("arm64-v8a", "arm64")), ("Armeabi-v7a", ("armeabi-v7a", "armv7")),
+    ("x86_64", ("x86_64",)), ("x86", ("x86",)), ("Arm", ("arm",)),
+    ("Mod", ("mod", "مود")),
+    ("PC", ("pc", "کامپیوتر")), ("Windows", ("windows", "ویندوز")),
+    ("Data", ("data", "obb", "دیتا")),
+)
+_VARIANT_KEY_ORDER = tuple(key for key, _ in VARIANT_KEYWORDS_ORDERED)
+_ARCH_VARIANTS = frozenset(("Arm64-v8a", "Armeabi-v7a", "x86_64", "x86", "Arm"))
+_VARIANT_PATTERN_TO_KEY = {pattern: key for key, patterns in VARIANT_KEYWORDS_ORDERED for pattern in patterns}
+
+if ahocorasick is not None:
+    _VARIANT_AUTOMATON = ahocorasick.Automaton()
+    for _pattern, _key in _VARIANT_PATTERN_TO_KEY.items():
+        _VARIANT_AUTOMATON.add_word(_pattern, (len(_pattern), _key))
+    _VARIANT_AUTOMATON.make_automaton()
+else:
+    _VARIANT_AUTOMATON = None
+# Fallback when pyahocorasick is not installed: all patterns in one alternation
+_VARIANT_DETECT_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(p) for p in sorted(_VARIANT_PATTERN_TO_KEY, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE)
+
+def _has_class(css_class):
+    """XPath predicate matching one whitespace-separated class token (like BeautifulSoup's class_=)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')"
+
+# First downloadbox -> its first download-links list -> every download-link item in it
+DOWNLOAD_LIS_XPATH = (f"(//section[{_has_class('downloadbox')}])[1]"
+                      f"/descendant::ul[{_has_class('download-links')}][1]"
+                      f"//li[{_has_class('download-link')}]")
+# First download-btn anchor of every such item, collected in the same tree walk
+DOWNLOAD_BTNS_XPATH = DOWNLOAD_LIS_XPATH + f"/descendant::a[{_has_class('download-btn')}][1]"
+LINK_TEXT_XPATH = f"descendant::span[{_has_class('txt')}][1]"
+# Run in the browser: returns a minimal document holding only what scraping reads (<title>, the first h1 with
+# "title" in its class, the first section.downloadbox), so the rest of the rendered page is neither sent
+# over the WebDriver connection nor parsed. null when there is no downloadbox.
+SCRAPED_SUBTREES_JS = """
+const box = document.querySelector('section.downloadbox');
+if (!box) return null;
+const title = document.querySelector('title');
+const h1 = Array.from(document.querySelectorAll('h1')).find(h => /title/i.test(h.getAttribute('class') || ''));
+return '<html><head>' + (title ? title.outerHTML : '') + '</head><body>' +
+       (h1 ? h1.outerHTML : '') + box.outerHTML + '</body></html>';
+"""
+# Compiled once; calling these skips re-parsing the expression on every tree.xpath()
+_DOWNLOAD_LIS = lxml.etree.XPath(DOWNLOAD_LIS_XPATH)
+_DOWNLOAD_BTNS = lxml.etree.XPath(DOWNLOAD_BTNS_XPATH)
+_LINK_TEXT = lxml.etree.XPath(LINK_TEXT_XPATH)
+
+def json_dumps_bytes(obj):
+    """Serializes obj as UTF-8 JSON (compact, or 2-space indented when DEBUG is set), with orjson when installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if PRETTY_JSON else 0)
+        return orjson.dumps(obj, option=option)
+    if PRETTY_JSON:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_loads_bytes(raw):
+    """Parses UTF-8 JSON bytes, with orjson when installed; raises json.JSONDecodeError (orjson's subclasses it)."""
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def write_json_file(path, obj):
+    """Writes obj to a temp file and renames it over path, so a crash never leaves a half-written file."""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps_bytes(obj))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+@contextlib.contextmanager
+def json_array_writer(path):
+    """Yields a function that appends one item to a JSON array streamed into path (same temp file + rename as write_json_file)."""
+    tmp_path = path + ".tmp"
+    separator = b",\n" if PRETTY_JSON else b","
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b"[\n" if PRETTY_JSON else b"[")
+            first = True
+            def append(item):
+                nonlocal first
+                if not first: f.write(separator)
+                f.write(json_dumps_bytes(item))
+                first = False
+            yield append
+            f.write(b"\n]" if PRETTY_JSON else b"]")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
 def load_tracker():
     if os.path.exists(TRACKING_FILE):
         try:
-            with open(TRACKING_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logging.info(f"فایل ردیابی {TRACKING_FILE} با موفقیت بارگذاری شد.")
-                return data
+            with open(TRACKING_FILE, 'rb') as f:
+                raw = f.read()
+            data = json_loads_bytes(raw)
+            logger.info(f"فایل ردیابی {TRACKING_FILE} با موفقیت بارگذاری شد.")
+            return data
         except json.JSONDecodeError:
-            logging.warning(f"{TRACKING_FILE} خراب است. با ردیاب خالی شروع می شود.")
+            logger.warning(f"{TRACKING_FILE} خراب است. با ردیاب خالی شروع می شود.")
             return {}
-    logging.info(f"فایل ردیابی {TRACKING_FILE} یافت نشد. با ردیاب خالی شروع می شود.")
+    logger.info(f"فایل ردیابی {TRACKING_FILE} یافت نشد. با ردیاب خالی شروع می شود.")
     return {}
 
+def load_page_cache():
+    """Returns {url: {"etag": ..., "last_modified": ...}} from the previous run, or {}."""
+    try:
+        with open(PAGE_CACHE_INDEX, 'rb') as f:
+            raw = f.read()
+        page_cache = json_loads_bytes(raw)
+    except (OSError, ValueError): # Missing or corrupt index just means a cold cache
+        return {}
+    if not isinstance(page_cache, dict): # e.g. [] or null is corrupt too
+        return {}
+    return {url: entry for url, entry in page_cache.items() if isinstance(entry, dict)} # Drop corrupt entries only
+
+def save_page_cache(page_cache, urls):
+    """Writes the cache index, dropping entries (and their HTML) for URLs no longer being checked."""
+    for url in [u for u in page_cache if u not in urls]:
+        del page_cache[url]
+        with contextlib.suppress(OSError): os.remove(_cached_page_path(url))
+    try:
+        os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+        write_json_file(PAGE_CACHE_INDEX, page_cache)
+    except OSError as e:
+        logger.warning(f"ذخیره کش صفحات ناموفق بود: {e}")
+
+def _cached_page_path(url):
+    return os.path.join(PAGE_CACHE_DIR, hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest() + ".html.gz")
+
+def read_cached_page(url):
+    try:
+        with gzip.open(_cached_page_path(url), 'rt', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, EOFError): # Also covers gzip.BadGzipFile
+        return None
+
+def write_cached_page(url, html):
+    path = _cached_page_path(url)
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e: # Like write_json_file, never leave the temp file behind; a failed write just skips caching
+        with contextlib.suppress(OSError): os.remove(tmp_path)
+        logger.warning(f"نوشتن کش صفحه برای {url} ناموفق بود: {e}")
+        return False
+
+@functools.lru_cache(maxsize=1024)
+def _parse_version(version_str):
+    return parse(version_str) # Version objects are immutable, so cached ones can be shared
+
 def compare_versions(current_v_str, last_v_str):
-    logging.info(f"مقایسه نسخه ها: فعلی='{current_v_str}', قبلی='{last_v_str}'")
+    logger.debug("مقایسه نسخه ها: فعلی='%s', قبلی='%s'", current_v_str, last_v_str)
     try:
         if not current_v_str:
-            logging.warning("نسخه فعلی نامعتبر است (خالی).")
+            logger.warning("نسخه فعلی نامعتبر است (خالی).")
             return False
         if not last_v_str or last_v_str == "0.0.0":
-            logging.info(f"نسخه قبلی یافت نشد یا 0.0.0 بود. نسخه فعلی '{current_v_str}' جدید است.")
+            logger.info(f"نسخه قبلی یافت نشد یا 0.0.0 بود. نسخه فعلی '{current_v_str}' جدید است.")
             return True
+        if current_v_str == last_v_str: # Common no-update case: no need to parse either side
+            return False
         try:
-            parsed_current = parse(current_v_str)
-            parsed_last = parse(last_v_str)
+            parsed_current = _parse_version(current_v_str)
+            parsed_last = _parse_version(last_v_str)
             if parsed_current > parsed_last: return True
             elif parsed_current < parsed_last: return False
             else: return current_v_str != last_v_str and current_v_str > last_v_str 
         except InvalidVersion:
-            logging.warning(f"InvalidVersion ao تجزیه '{current_v_str}' یا '{last_v_str}'. مقایسه رشته ای.")
+            logger.warning(f"InvalidVersion ao تجزیه '{current_v_str}' یا '{last_v_str}'. مقایسه رشته ای.")
             return current_v_str != last_v_str and current_v_str > last_v_str
         except TypeError: 
-            logging.warning(f"TypeError هنگام مقایسه '{current_v_str}' با '{last_v_str}'. مقایسه رشته ای.")
+            logger.warning(f"TypeError هنگام مقایسه '{current_v_str}' با '{last_v_str}'. مقایسه رشته ای.")
             return current_v_str != last_v_str and current_v_str > last_v_str
     except Exception as e:
-        logging.error(f"خطا در compare_versions ('{current_v_str}' vs '{last_v_str}'): {e}")
+        logger.error(f"خطا در compare_versions ('{current_v_str}' vs '{last_v_str}'): {e}")
         return current_v_str != last_v_str and current_v_str > last_v_str
 
+@functools.lru_cache(maxsize=512)
 def sanitize_text_for_tracking_id(text): # Simplified sanitize for tracking ID parts
     if not text: return ""
     text_cleaned = text.strip().lower()
-    text_cleaned = text_cleaned.replace('–', '-').replace('—', '-')
-    text_cleaned = re.sub(r'[^a-z0-9-_]', '', text_cleaned) # Keep only alphanumeric, dash, underscore
-    text_cleaned = re.sub(r'[-_]+', '_', text_cleaned) # Consolidate dash/underscore to single underscore
+    # Keep only alphanumeric, dash, underscore: the table drops other ASCII and maps en/em dashes to '-',
+    # the ascii encode drops everything non-ASCII
+    text_cleaned = text_cleaned.translate(_TRACKING_ID_TRANSLATE).encode('ascii', 'ignore').decode('ascii')
+    text_cleaned = _UNDERSCORES.sub('_', text_cleaned) # Consolidate dash/underscore to single underscore
     text_cleaned = text_cleaned.strip('_')
     return text_cleaned
 
 
+@functools.lru_cache(maxsize=512)
 def aggressively_clean_name_for_tracking(name_to_clean):
     """Aggressively cleans a name for tracking ID purposes."""
     cleaned_name = name_to_clean
     
-    for pattern in VERSION_PATTERNS_FOR_CLEANING:
-        cleaned_name = re.sub(pattern, '', cleaned_name, flags=re.IGNORECASE).strip("-_ ")
-        cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip("-_ ")
+    for rx in _VERSION_CLEAN_REGEXES:
+        cleaned_name = rx.sub('', cleaned_name).strip("-_ ")
+        cleaned_name = _WS.sub(' ', cleaned_name).strip("-_ ")
 
-    all_keywords_for_aggressive_clean = COMMON_VARIANT_KEYWORDS_TO_DETECT_AND_CLEAN + \
-                                        ["PC", "کامپیوتر", "ویندوز", "Windows", "Lite", "لایت", "Pro", "پرو"] 
-    
-    sorted_keywords = sorted(list(set(all_keywords_for_aggressive_clean)), key=len, reverse=True)
-
-    for kw in sorted_keywords:
-        kw_regex = r'\b' + re.escape(kw) + r'\b'
-        prev_name = None
-        while prev_name != cleaned_name: 
-            prev_name = cleaned_name
-            cleaned_name = re.sub(kw_regex, '', cleaned_name, flags=re.IGNORECASE).strip("-_ ")
-            cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip("-_ ")
-
-    cleaned_name = re.sub(r'\s*\((?:www\.)?farsroid\.com.*?\)\s*$', '', cleaned_name, flags=re.IGNORECASE).strip()
-    cleaned_name = re.sub(r'\s*[-–—]\s*Farsroid\s*$', '', cleaned_name, flags=re.IGNORECASE).strip()
+    cleaned_name = _VARIANT_STRIP_RE.sub('', cleaned_name).strip("-_ ")
+    cleaned_name = _WS.sub(' ', cleaned_name).strip("-_ ")
+
+    cleaned_name = _SITE_SUFFIX.sub('', cleaned_name).strip()
+    cleaned_name = _FARSROID_DASH_SUFFIX.sub('', cleaned_name).strip()
     cleaned_name = cleaned_name.strip(' -–—') 
-    cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip()
+    cleaned_name = _WS.sub(' ', cleaned_name).strip()
     if not cleaned_name: 
         name_parts = name_to_clean.split()
         if name_parts: cleaned_name = name_parts[0] 
     return cleaned_name
 
 
-def extract_app_name_from_page(soup, page_url):
+def extract_app_name_from_page(tree, page_url):
+    """Returns (display name, base name for tracking IDs) for the page."""
+    # The aggressive cleaner still runs its unanchored version passes: the display name keeps versions
+    # that are not at the very end (e.g. "App 1.2 – ...")
+    page_name_for_display = _extract_display_app_name(tree, page_url)
+    base_app_name_for_tracking_id = aggressively_clean_name_for_tracking(page_name_for_display) or "UnknownApp"
+    return page_name_for_display, base_app_name_for_tracking_id
+
+
+def _extract_display_app_name(tree, page_url):
     """Extracts app name from H1/Title, performs light cleaning (versions at end, site tags)."""
     app_name_candidate = None
-    h1_tag = soup.find('h1', class_=re.compile(r'title', re.IGNORECASE))
-    if h1_tag and h1_tag.text.strip():
-        app_name_candidate = h1_tag.text.strip()
+    h1_tag = next((h1 for h1 in tree.iter('h1') if _H1_TITLE_CLASS.search(h1.get('class', ''))), None)
+    if h1_tag is not None and h1_tag.text_content().strip():
+        app_name_candidate = h1_tag.text_content().strip()
     
     if not app_name_candidate:
-        title_tag = soup.find('title')
-        if title_tag and title_tag.text.strip():
-            app_name_candidate = title_tag.text.strip()
-            app_name_candidate = re.sub(r'\s*[-|–—]\s*(?:فارسروید|دانلود.*)$', '', app_name_candidate, flags=re.IGNORECASE).strip()
-            app_name_candidate = re.sub(r'\s*–\s*اپلیکیشن.*$', '', app_name_candidate, flags=re.IGNORECASE).strip()
+        title_tag = tree.find('.//title')
+        if title_tag is not None and title_tag.text_content().strip():
+            # Whitespace is collapsed first so the suffix's ".*" also reaches past line breaks in the title
+            app_name_candidate = _WS.sub(' ', title_tag.text_content()).strip()
+            app_name_candidate = _TITLE_SUFFIX.sub('', app_name_candidate).strip()
 
     if app_name_candidate:
         original_name = app_name_candidate 
@@ -171,123 +415,190 @@ def extract_app_name_from_page(soup, page_url):
         page_name_for_display = app_name_candidate # Keep it richer for display
         
         # Lightly clean for display (remove Farsroid tags, maybe trailing versions)
-        page_name_for_display = re.sub(r'\s*\((?:www\.)?farsroid\.com.*?\)\s*$', '', page_name_for_display, flags=re.IGNORECASE).strip()
-        for pattern in VERSION_PATTERNS_FOR_CLEANING: # Remove versions if they are at the very end
-            page_name_for_display = re.sub(pattern + r'$', '', page_name_for_display, flags=re.IGNORECASE).strip("-_ ")
+        page_name_for_display = _SITE_SUFFIX.sub('', page_name_for_display).strip()
+        for rx in _VERSION_CLEAN_ENDS: # Remove versions if they are at the very end
+            page_name_for_display = rx.sub('', page_name_for_display).strip("-_ ")
 
         page_name_for_display = page_name_for_display.strip(' -–—')
-        page_name_for_display = re.sub(r'\s+', ' ', page_name_for_display).strip()
+        page_name_for_display = _WS.sub(' ', page_name_for_display).strip()
 
 
         if page_name_for_display:
-            logging.info(f"نام برنامه از H1/Title (اصلی: '{original_name}', برای نمایش: '{page_name_for_display}')")
+            logger.info(f"نام برنامه از H1/Title (اصلی: '{original_name}', برای نمایش: '{page_name_for_display}')")
             return page_name_for_display
     
     # Fallback to URL if H1/Title fails (less aggressive cleaning here)
-    logging.info(f"نام برنامه از H1/Title استخراج نشد، تلاش برای استخراج از URL: {page_url}")
+    logger.info(f"نام برنامه از H1/Title استخراج نشد، تلاش برای استخراج از URL: {page_url}")
     parsed_url = urlparse(page_url)
     path_parts = [part for part in unquote(parsed_url.path).split('/') if part]
     if path_parts:
         guessed_name = path_parts[-1]
         # Remove extension
-        known_extensions_regex = r'\.(apk|zip|exe|rar|xapk|apks|msi|dmg|pkg|deb|rpm|appimage|tar\.gz|tgz|tar\.bz2|tbz2|tar\.xz|txz|7z|gz|bz2|xz|jpg|jpeg|png|gif|bmp|tiff|tif|webp|svg|ico|mp3|wav|ogg|aac|flac|m4a|wma|mp4|mkv|avi|mov|wmv|flv|webm|mpeg|mpg|txt|pdf|doc|docx|xls|xlsx|ppt|pptx|odt|ods|odp|rtf|csv|html|htm|xml|json|md|ttf|otf|woff|woff2|eot)$'
-        guessed_name = re.sub(known_extensions_regex, '', guessed_name, flags=re.IGNORECASE)
+        guessed_name = _EXT_RE.sub('', guessed_name)
         # Remove versions
-        for pattern in VERSION_PATTERNS_FOR_CLEANING:
-            guessed_name = re.sub(pattern, '', guessed_name, flags=re.IGNORECASE).strip("-_ ")
+        for rx in _VERSION_CLEAN_REGEXES:
+            guessed_name = rx.sub('', guessed_name).strip("-_ ")
         # Remove only very generic URL terms
-        generic_url_terms = r'\b(دانلود|Download|برنامه|App|Apk|Farsroid|Android)\b'
-        guessed_name = re.sub(generic_url_terms, '', guessed_name, flags=re.IGNORECASE).strip("-_ ")
+        guessed_name = _GENERIC_URL_TERMS.sub('', guessed_name).strip("-_ ")
         # Capitalize and join
-        guessed_name = ' '.join(word.capitalize() for word in re.split(r'[-_]+', guessed_name) if word)
-        guessed_name = re.sub(r'\s+', ' ', guessed_name).strip()
+        guessed_name = ' '.join(word.capitalize() for word in _UNDERSCORES.split(guessed_name) if word)
+        guessed_name = _WS.sub(' ', guessed_name).strip()
         if guessed_name:
-            logging.info(f"نام حدس زده شده از URL (پاکسازی شده): {guessed_name}")
+            logger.info(f"نام حدس زده شده از URL (پاکسازی شده): {guessed_name}")
             return guessed_name
             
-    logging.warning(f"نام برنامه از هیچ منبعی استخراج نشد. URL: {page_url}")
+    logger.warning(f"نام برنامه از هیچ منبعی استخراج نشد. URL: {page_url}")
     return "UnknownApp"
 
 
-def get_page_source_with_selenium(url, wait_time=20, wait_for_class="downloadbox"):
-    # Note: The URL cleaning is now done in main() before this function is called.
-    # So, the 'url' parameter here is expected to be already cleaned.
-    logging.info(f"در حال دریافت {url} با Selenium...")
+# Resolved once per run so ChromeDriverManager's version check isn't repeated; setting CHROMEDRIVER_PATH
+# skips it entirely. "" means resolution failed and the default service is used.
+_CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH') or None
+_CHROMEDRIVER_LOCK = threading.Lock()
+
+def get_chromedriver_path():
+    """Returns the chromedriver path ("" for the default service), resolving it at most once across threads."""
+    global _CHROMEDRIVER_PATH
+    with _CHROMEDRIVER_LOCK: # Workers may start their first drivers at the same time
+        if _CHROMEDRIVER_PATH is None:
+            try:
+                _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+            except Exception as e_driver_manager:
+                logger.warning(f"خطا در ChromeDriverManager: {e_driver_manager}. استفاده از درایور پیشفرض.")
+                _CHROMEDRIVER_PATH = ""
+        return _CHROMEDRIVER_PATH
+
+def make_driver():
+    """Creates a headless Chrome WebDriver; meant to be created once and reused for all URLs."""
     chrome_options = ChromeOptions()
+    chrome_options.page_load_strategy = "eager" # driver.get() returns at DOMContentLoaded, not after every subresource
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu") 
     chrome_options.add_argument("--window-size=1920,1080") 
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36")
-    driver = None
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    # Only the DOM is scraped, so skip downloading images, stylesheets, fonts and plugin content, and block popups
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+        "profile.managed_default_content_settings.plugins": 2,
+        "profile.managed_default_content_settings.popups": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chromedriver_path = get_chromedriver_path()
+    service = ChromeService(executable_path=chromedriver_path) if chromedriver_path else ChromeService() # Default service if manager failed
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def reset_driver(driver):
+    """Clears cookies and unloads the page so a reused driver starts the next URL from a clean state."""
+    driver.delete_all_cookies()
+    driver.get("about:blank")
+
+
+def fetch_with_requests(url, timeout=15, page_cache=None):
+    """Fetches the server-rendered HTML with the shared session; returns None on any failure.
+    With page_cache, the stored validators are sent and the cached page is returned on 304 Not Modified."""
+    entry = page_cache.get(url) if page_cache is not None else None
+    headers = {}
+    if entry:
+        if entry.get('etag'): headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'): headers['If-Modified-Since'] = entry['last_modified']
+    try:
+        response = SESSION.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and entry:
+            cached_html = read_cached_page(url)
+            if cached_html is not None:
+                logger.info(f"صفحه {url} تغییر نکرده است (304). استفاده از نسخه کش شده.")
+                return cached_html
+            response = SESSION.get(url, timeout=timeout) # Cached file is gone: fetch the full page
+        response.raise_for_status()
+        if response.encoding is None or response.encoding.lower() == 'iso-8859-1': # No charset in headers
+            response.encoding = response.apparent_encoding
+        html = response.text
+        if page_cache is not None:
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            if (etag or last_modified) and write_cached_page(url, html):
+                page_cache[url] = {"etag": etag, "last_modified": last_modified}
+            else: # Nothing to revalidate against next time, so the previous run's copy is stale too
+                page_cache.pop(url, None)
+                with contextlib.suppress(OSError): os.remove(_cached_page_path(url))
+        return html
+    except Exception as e:
+        logger.warning(f"دریافت {url} با requests ناموفق بود: {e}")
+        return None
+
+
+def fetch(driver, url, wait_time=20, wait_for_class="downloadbox", links_wait_time=10):
+    # Note: The URL cleaning is now done in main() before this function is called.
+    # So, the 'url' parameter here is expected to be already cleaned.
+    logger.info(f"در حال دریافت {url} با Selenium...")
     try:
-        try:
-            driver_path = ChromeDriverManager().install()
-            service = ChromeService(executable_path=driver_path)
-        except Exception as e_driver_manager:
-            logging.warning(f"خطا در ChromeDriverManager: {e_driver_manager}. استفاده از درایور پیشفرض.")
-            service = ChromeService() # Fallback to default service if manager fails
-        driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.get(url) # The URL passed here should be clean
         WebDriverWait(driver, wait_time).until(EC.presence_of_element_located((By.CLASS_NAME, wait_for_class)))
-        time.sleep(5) 
-        page_source = driver.page_source
-        logging.info(f"موفقیت در دریافت سورس صفحه با Selenium برای {url}")
+        try: # Wait for the actual download anchors instead of a fixed sleep
+            WebDriverWait(driver, links_wait_time).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, DOWNLOAD_LINK_SELECTOR)))
+        except TimeoutException:
+            logger.warning(f"لینک های دانلود در {links_wait_time} ثانیه برای {url} ظاهر نشدند. ادامه با سورس فعلی.")
+            time.sleep(LINKS_GRACE_SECONDS) # Short grace period for a late render
+        page_source = None
+        try:
+            page_source = driver.execute_script(SCRAPED_SUBTREES_JS)
+        except Exception as e:
+            logger.warning(f"استخراج بخش های لازم صفحه {url} ناموفق بود: {e}. استفاده از سورس کامل.")
+        if not page_source: # No downloadbox (or script failed): hand back the full page as before
+            page_source = driver.page_source
+        logger.info(f"موفقیت در دریافت سورس صفحه با Selenium برای {url}")
         return page_source
     except Exception as e:
-        logging.error(f"خطای Selenium برای {url}: {e}", exc_info=True)
-        if driver: 
-            try: return driver.page_source # Try to get source even on error if driver exists
-            except: pass
+        logger.error(f"خطای Selenium برای {url}: {e}", exc_info=True)
+        try: return driver.page_source # Try to get source even on error
+        except: pass
         return None
-    finally:
-        if driver:
-            driver.quit()
 
 
 def extract_version_from_text_or_url(text_content, url_content):
-    if text_content:
-        for pattern in VERSION_REGEX_PATTERNS:
-            match = re.search(pattern, text_content)
+    sources = [s for s in (text_content, url_content) if s]
+    # Fallback pattern only if the more specific ones fail on both sources
+    for rx in _VERSION_REGEXES + [_VERSION_FALLBACK_RE]:
+        for source in sources:
+            match = rx.search(source)
             if match: return match.group(1).strip("-_ ")
-    if url_content:
-        for pattern in VERSION_REGEX_PATTERNS:
-            match = re.search(pattern, url_content) 
-            if match: return match.group(1).strip("-_ ")
-    # Fallback pattern if more specific ones fail
-    fallback_pattern = r'(\d+\.\d+(?:\.\d+){0,2}(?:[.-]?[a-zA-Z0-9]+)*)' 
-    if text_content:
-        match = re.search(fallback_pattern, text_content)
-        if match: return match.group(1).strip("-_ ")
-    if url_content:
-        match = re.search(fallback_pattern, url_content)
-        if match: return match.group(1).strip("-_ ")
     return None
 
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+def detect_link_variants(text):
+    """Returns the variant keys whose patterns occur as whole words in the (lowercased) text."""
+    found = set()
+    if _VARIANT_AUTOMATON is not None:
+        for end, (length, key) in _VARIANT_AUTOMATON.iter(text):
+            start = end - length + 1
+            # Same semantics as \b...\b: reject matches glued to other word characters
+            if start > 0 and _is_word_char(text[start - 1]): continue
+            if end + 1 < len(text) and _is_word_char(text[end + 1]): continue
+            found.add(key)
+    else:
+        found = {_VARIANT_PATTERN_TO_KEY[m.group(0).lower()] for m in _VARIANT_DETECT_RE.finditer(text)}
+    if "Mod-Extra" in found or "Mod-Lite" in found: found.discard("Mod")
+    if "Mod-Lite" in found: found.discard("Lite")
+    return [key for key in _VARIANT_KEY_ORDER if key in found]
+
 def get_file_extension_from_url(download_url, combined_text_for_variant):
     parsed_url_path = urlparse(download_url).path
     raw_filename_from_url = os.path.basename(parsed_url_path)
     
-    double_extensions = [".tar.gz", ".tar.bz2", ".tar.xz"]
-    for de in double_extensions:
-        if raw_filename_from_url.lower().endswith(de): return de
+    raw_filename_lower = raw_filename_from_url.lower()
+    if raw_filename_lower.endswith(_DOUBLE_EXTS):
+        return next(de for de in _DOUBLE_EXTS if raw_filename_lower.endswith(de))
 
     _, ext_from_url = os.path.splitext(raw_filename_from_url)
     
-    known_extensions = [
-        '.apk', '.zip', '.exe', '.rar', '.xapk', '.apks', '.7z', '.gz', '.bz2', '.xz',
-        '.msi', '.dmg', '.pkg', '.deb', '.rpm', '.appimage',
-        '.tgz', '.tbz2', '.txz', 
-        '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp', '.svg', '.ico',
-        '.mp3', '.wav', '.ogg', '.aac', '.flac', '.m4a', '.wma',
-        '.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.mpeg', '.mpg',
-        '.txt', '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', 
-        '.odt', '.ods', '.odp', '.rtf', '.csv', '.html', '.htm', '.xml', '.json', '.md',
-        '.ttf', '.otf', '.woff', '.woff2', '.eot'
-    ]
-    
-    if ext_from_url and ext_from_url.lower() in known_extensions:
+    if ext_from_url and ext_from_url.lower() in _KNOWN_EXTS:
         return ext_from_url.lower()
     else:
         # Guess based on variant text if primary extension detection fails
@@ -301,75 +612,63 @@ def get_file_extension_from_url(download_url, combined_text_for_variant):
         return ".bin" # Default fallback
 
 
-def scrape_farsroid_page(page_url, soup, tracker_data):
+def build_suggested_filename(filename_from_url_decoded, file_extension):
+    # --- ساخت نام فایل پیشنهادی (رویکرد جدید و ساده‌تر) ---
+    # فقط پسوند سایت را حذف کن
+    suggested_filename = _SITE_SUFFIX_ANYWHERE.sub('', filename_from_url_decoded).strip()
+    # اطمینان از اینکه پسوند فایل حفظ شده
+    if not os.path.splitext(suggested_filename)[1]: # اگر پسوند ندارد
+        base_name_no_ext = os.path.splitext(filename_from_url_decoded)[0]
+        base_name_no_ext_cleaned = _SITE_SUFFIX_ANYWHERE.sub('', base_name_no_ext).strip()
+        suggested_filename = base_name_no_ext_cleaned + file_extension
+    # The workflow saves to "$DOWNLOAD_DIR/<name>", so characters invalid in file names (including a "/"
+    # decoded from %2F) are replaced in a single translate pass
+    return suggested_filename.translate(_FILENAME_TRANSLATE)
+
+
+def scrape_farsroid_page(page_url, tree, tracker_data):
     updates_found_on_page = []
-    # page_app_name_full is the name from H1/Title, lightly cleaned
-    page_app_name_for_display = extract_app_name_from_page(soup, page_url) 
-    logging.info(f"پردازش صفحه: {page_url} (نام برنامه از صفحه برای نمایش: '{page_app_name_for_display}')")
-
-    # For tracking ID, use an aggressively cleaned name to ensure stability
-    base_app_name_for_tracking_id = aggressively_clean_name_for_tracking(page_app_name_for_display) # Use the display name as input
-    if not base_app_name_for_tracking_id: base_app_name_for_tracking_id = "UnknownApp" 
-    logging.info(f"  نام پایه برای شناسه ردیابی: '{base_app_name_for_tracking_id}'")
-
-    download_box = soup.find('section', class_='downloadbox')
-    if not download_box: return updates_found_on_page
-    download_links_ul = download_box.find('ul', class_='download-links')
-    if not download_links_ul: return updates_found_on_page
-    found_lis = download_links_ul.find_all('li', class_='download-link')
-    if not found_lis: return updates_found_on_page
-
-    logging.info(f"تعداد {len(found_lis)} آیتم li.download-link پیدا شد.")
-
-    for i, li in enumerate(found_lis):
-        logging.info(f"--- پردازش li شماره {i+1} ---")
-        link_tag = li.find('a', class_='download-btn')
-        if not link_tag or not link_tag.get('href'): continue
-
-        download_url = urljoin(page_url, link_tag['href'])
-        link_text_span = link_tag.find('span', class_='txt')
-        link_text = link_text_span.text.strip() if link_text_span else ""
-        logging.info(f"  URL: {download_url}, متن لینک: {link_text}")
+    # Display name is the name from H1/Title, lightly cleaned; for tracking ID an aggressively cleaned
+    # name is used to ensure stability
+    page_app_name_for_display, base_app_name_for_tracking_id = extract_app_name_from_page(tree, page_url)
+    logger.info(f"پردازش صفحه: {page_url} (نام برنامه از صفحه برای نمایش: '{page_app_name_for_display}')")
+    logger.info(f"  نام پایه برای شناسه ردیابی: '{base_app_name_for_tracking_id}'")
+    # Constant for the whole page, so computed once rather than per li
+    tracking_id_app_part = sanitize_text_for_tracking_id(base_app_name_for_tracking_id)
+    join_page_url = functools.partial(urljoin, page_url)
+
+    found_links = _DOWNLOAD_BTNS(tree)
+    if not found_links: return updates_found_on_page
+
+    logger.info(f"تعداد {len(found_links)} لینک li.download-link > a.download-btn پیدا شد.")
+
+    # Per-link step details are debug-level with lazy %-args, so nothing is formatted at the default INFO level
+    for i, link_tag in enumerate(found_links):
+        logger.debug("--- پردازش لینک شماره %d ---", i + 1)
+        if not link_tag.get('href'): continue
+
+        download_url = join_page_url(link_tag.get('href'))
+        link_text_span = next(iter(_LINK_TEXT(link_tag)), None)
+        link_text = link_text_span.text_content().strip() if link_text_span is not None else ""
+        logger.debug("  URL: %s, متن لینک: %s", download_url, link_text)
 
         filename_from_url_decoded = unquote(urlparse(download_url).path.split('/')[-1])
         current_version = extract_version_from_text_or_url(link_text, filename_from_url_decoded)
 
         if not current_version:
-            logging.warning(f"  نسخه استخراج نشد.")
+            logger.warning(f"  نسخه استخراج نشد.")
             continue
-        logging.info(f"  نسخه: {current_version}")
+        logger.debug("  نسخه: %s", current_version)
 
         # --- تشخیص نوع (Variant) فقط از لینک دانلود ---
-        link_only_variant_parts = []
         # Prepare a combined text from link and filename for robust variant detection
-        combined_text_for_link_variant_detection = (filename_from_url_decoded.lower() + " " + link_text.lower()).replace('(farsroid.com)', '').replace('دانلود فایل نصبی', '').replace('برنامه با لینک مستقیم', '').strip()
-        combined_text_for_link_variant_detection = re.sub(r'\b(?:با لینک مستقیم|مگابایت|\d+)\b', '', combined_text_for_link_variant_detection, flags=re.IGNORECASE).strip()
-        
-        variant_keywords_ordered = { 
-            "Mod-Extra": ["mod-extra", "مود اکسترا"], "Mod-Lite": ["mod-lite", "مود لایت"],
-            "Ad-Free": ["ad-free", "بدون تبلیغات"], "Unlocked": ["unlocked", "آنلاک"], "Patched": ["patched", "پچ شده"],
-            "Premium": ["premium", "پرمیوم"], "Ultra": ["ultra", "اولترا"], "Clone": ["clone", "کلون"],
-            "Beta": ["beta", "بتا"], "Full": ["full", "کامل"], "Lite": ["lite", "لایت"], "Main": ["main"],
-            "Pro": ["pro", "پرو"], "VIP": ["vip"], "Plus": ["plus", "پلاس"],
-            "Persian": ["persian", "فارسی"], "English": ["english", "انگلیسی"],
-            "Arm64-v8a": ["arm64-v8a", "arm64"], "Armeabi-v7a": ["armeabi-v7a", "armv7"],
-            "x86_64": ["x86_64"], "x86": ["x86"], "Arm": ["arm"], 
-            "Mod": ["mod", "مود"], 
-            "PC": ["pc", "کامپیوتر"], "Windows": ["windows", "ویندوز"], 
-            "Data": ["data", "obb", "دیتا"]
-        }
-        
-        temp_combined_text = combined_text_for_link_variant_detection
-        for key, patterns in variant_keywords_ordered.items():
-            for pattern in patterns:
-                if re.search(r'\b' + re.escape(pattern) + r'\b', temp_combined_text, flags=re.IGNORECASE):
-                    if key == "Mod" and any(k in link_only_variant_parts for k in ["Mod-Extra", "Mod-Lite"]): continue
-                    if key == "Lite" and "Mod-Lite" in link_only_variant_parts: continue
-                    if key not in link_only_variant_parts: link_only_variant_parts.append(key)
-                    break 
+        combined_text_for_link_variant_detection = (filename_from_url_decoded.lower() + " " + link_text.lower())
+        combined_text_for_link_variant_detection = _LINK_BOILERPLATE.sub('', combined_text_for_link_variant_detection).strip()
+        combined_text_for_link_variant_detection = _LINK_NOISE.sub('', combined_text_for_link_variant_detection).strip()
+        link_only_variant_parts = detect_link_variants(combined_text_for_link_variant_detection)
         
         file_extension = get_file_extension_from_url(download_url, combined_text_for_link_variant_detection)
-        logging.info(f"  پسوند فایل: {file_extension}")
+        logger.debug("  پسوند فایل: %s", file_extension)
         
         if file_extension == ".exe":
             if "PC" in link_only_variant_parts:
@@ -377,9 +676,9 @@ def scrape_farsroid_page(page_url, soup, tracker_data):
             if "Windows" not in link_only_variant_parts:
                 link_only_variant_parts.append("Windows")
         
-        arch_found_in_link_variants = any(arch_kw in link_only_variant_parts for arch_kw in ["Arm64-v8a", "Armeabi-v7a", "x86_64", "x86", "Arm"])
+        arch_found_in_link_variants = not _ARCH_VARIANTS.isdisjoint(link_only_variant_parts)
         
-        temp_display_variants = sorted(list(set(link_only_variant_parts))) 
+        temp_display_variants = sorted(set(link_only_variant_parts)) 
         variant_final_for_display_tracking = "-".join(temp_display_variants) if temp_display_variants else ""
         
         if not variant_final_for_display_tracking:
@@ -388,17 +687,17 @@ def scrape_farsroid_page(page_url, soup, tracker_data):
             # Add more defaults based on extension if needed
             else: variant_final_for_display_tracking = "Default" # Fallback for JSON/tracking
         
-        logging.info(f"  نوع نهایی برای نمایش/ردیابی: '{variant_final_for_display_tracking}'")
+        logger.debug("  نوع نهایی برای نمایش/ردیابی: '%s'", variant_final_for_display_tracking)
 
-        tracking_id_app_part = sanitize_text_for_tracking_id(base_app_name_for_tracking_id)
         tracking_id_variant_part = sanitize_text_for_tracking_id(variant_final_for_display_tracking)
         tracking_id = f"{tracking_id_app_part}_{tracking_id_variant_part}".lower()
-        tracking_id = re.sub(r'_+', '_', tracking_id).strip('_')
+        tracking_id = _MULTI_UNDERSCORE.sub('_', tracking_id).strip('_')
         # Refine tracking_id: remove generic suffixes if not an APK or if they are redundant
-        if tracking_id.endswith(("_default", "_archive", "_image", "_audio", "_video", "_document", "_font")) and file_extension != ".apk":
-            tracking_id = tracking_id.rsplit('_', 1)[0]
-        elif tracking_id.endswith('_universal') and file_extension != ".apk":
-            tracking_id = tracking_id[:-len('_universal')]
+        if file_extension != ".apk":
+            for suffix in _GENERIC_TRACKING_SUFFIXES:
+                if tracking_id.endswith(suffix):
+                    tracking_id = tracking_id[:-len(suffix)]
+                    break
         
         if not tracking_id_app_part and tracking_id_variant_part: # If app name was empty, use variant as base
             tracking_id = tracking_id_variant_part
@@ -407,24 +706,14 @@ def scrape_farsroid_page(page_url, soup, tracker_data):
         elif not tracking_id_app_part and not tracking_id_variant_part:
             tracking_id = "unknown_app_variant" # Absolute fallback
 
-        logging.info(f"  شناسه ردیابی: {tracking_id}")
-        
-        # --- ساخت نام فایل پیشنهادی (رویکرد جدید و ساده‌تر) ---
-        suggested_filename = filename_from_url_decoded
-        # فقط پسوند سایت را حذف کن
-        site_suffix_pattern = r'\s*\((?:www\.)?farsroid\.com.*?\)\s*'
-        suggested_filename = re.sub(site_suffix_pattern, '', suggested_filename, flags=re.IGNORECASE).strip()
-        # اطمینان از اینکه پسوند فایل حفظ شده
-        if not os.path.splitext(suggested_filename)[1]: # اگر پسوند ندارد
-            base_name_no_ext = os.path.splitext(filename_from_url_decoded)[0]
-            base_name_no_ext_cleaned = re.sub(site_suffix_pattern, '', base_name_no_ext, flags=re.IGNORECASE).strip()
-            suggested_filename = base_name_no_ext_cleaned + file_extension
-
-        logging.info(f"  نام فایل پیشنهادی (ساده شده): {suggested_filename}")
+        logger.debug("  شناسه ردیابی: %s", tracking_id)
         
         last_known_version = tracker_data.get(tracking_id, "0.0.0")
         if compare_versions(current_version, last_known_version):
-            logging.info(f"    => آپدیت جدید برای {tracking_id}: {current_version} (قبلی: {last_known_version})")
+            logger.info(f"    => آپدیت جدید برای {tracking_id}: {current_version} (قبلی: {last_known_version})")
+            # The filename is only needed for an update, so it is not built for up-to-date links
+            suggested_filename = build_suggested_filename(filename_from_url_decoded, file_extension)
+            logger.debug("  نام فایل پیشنهادی (ساده شده): %s", suggested_filename)
             updates_found_on_page.append({
                 "app_name": page_app_name_for_display, # Use the richer name for display
                 "version": current_version,
@@ -436,79 +725,157 @@ def scrape_farsroid_page(page_url, soup, tracker_data):
                 "current_version_for_tracking": current_version # Store the version used for comparison
             })
         else:
-            logging.info(f"    => {tracking_id} به‌روز است (فعلی: {current_version}, قبلی: {last_known_version}).")
+            logger.info(f"    => {tracking_id} به‌روز است (فعلی: {current_version}, قبلی: {last_known_version}).")
     return updates_found_on_page
 
+# Host (without "www.") -> scraper for that site's pages
+_SCRAPERS = {
+    "farsroid.com": scrape_farsroid_page,
+}
+
+def get_scraper(page_url):
+    """Returns the scraper registered for the URL's host, or None."""
+    try:
+        host = urlparse(page_url).hostname or "" # hostname is already lowercased
+    except ValueError: # Malformed URL (e.g. "Invalid IPv6 URL"): skipped like an unsupported site
+        return None
+    return _SCRAPERS.get(host.removeprefix("www."))
+
+def process_url(page_url, tracker_data, borrow_driver, page_cache=None):
+    """Fetches one URL (plain HTTP first, Selenium only if needed) and returns the updates found on it."""
+    logger.info(f"\n--- شروع بررسی URL: {page_url} ---")
+    scraper = get_scraper(page_url)
+    if scraper is None: # Checked before fetching, so unsupported pages never cost a request or a browser
+        logger.warning(f"خراش دهنده برای {page_url} پیاده سازی نشده است.")
+        return []
+    tree = None
+    rendered_by_selenium = False
+    page_content = fetch_with_requests(page_url, page_cache=page_cache)
+    # Cheap substring check first: pages without any download-link markup go straight to Selenium unparsed
+    if page_content and "download-link" in page_content:
+        try:
+            tree = lxml.html.fromstring(page_content)
+        except Exception as e:
+            logger.warning(f"تجزیه HTML دریافتی با requests برای {page_url} ناموفق بود: {e}")
+        if tree is not None and _DOWNLOAD_LIS(tree):
+            logger.info(f"downloadbox در HTML دریافتی با requests پیدا شد. Selenium لازم نیست.")
+        else:
+            tree = None
+    if page_content and tree is None:
+        logger.info(f"downloadbox در HTML دریافتی با requests نبود. استفاده از Selenium...")
+
+    if tree is None:
+        try:
+            with borrow_driver() as driver:
+                # Pass the cleaned page_url to Selenium function
+                page_content = fetch(driver, page_url, wait_for_class="downloadbox")
+        except Exception as e:
+            logger.error(f"خطا در راه اندازی Selenium: {e}", exc_info=True)
+            page_content = None
+        if not page_content:
+            logger.error(f"محتوای صفحه برای {page_url} با Selenium دریافت نشد. رد شدن...")
+            return []
+        rendered_by_selenium = True
+    updates_on_page = []
+    try:
+        if tree is None:
+            tree = lxml.html.fromstring(page_content)
+        # Keep the rendered page under the server page's validators, so a 304 next run skips Selenium
+        if rendered_by_selenium and page_cache and page_url in page_cache and _DOWNLOAD_LIS(tree):
+            write_cached_page(page_url, page_content)
+        updates_on_page = scraper(page_url, tree, tracker_data)
+    except Exception as e:
+        logger.error(f"خطا هنگام پردازش محتوای دریافت شده برای {page_url}: {e}", exc_info=True)
+    logger.info(f"--- پایان بررسی URL: {page_url} ---")
+    return updates_on_page
+
 def main():
     if not os.path.exists(URL_FILE):
-        logging.error(f"فایل URL ها یافت نشد: {URL_FILE}")
-        with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f: json.dump([], f)
+        logger.error(f"فایل URL ها یافت نشد: {URL_FILE}")
+        write_json_file(OUTPUT_JSON_FILE, [])
         if os.getenv('GITHUB_OUTPUT'):
             with open(GITHUB_OUTPUT_FILE, 'a', encoding='utf-8') as gh_output: gh_output.write(f"updates_count=0\n")
         sys.exit(1) 
 
-    raw_urls_from_file = []
-    with open(URL_FILE, 'r', encoding='utf-8') as f:
-        raw_urls_from_file = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
-    urls_to_process = []
-    for raw_url in raw_urls_from_file:
-        # *** NEW: Clean the URL by removing leading BOM characters ***
-        cleaned_url = raw_url.lstrip('\ufeff')
-        if cleaned_url != raw_url:
-            # Log if a URL was actually cleaned
-            logging.info(f"کاراکتر BOM از ابتدای URL '{raw_url}' حذف و به '{cleaned_url}' تبدیل شد.")
-        urls_to_process.append(cleaned_url)
+    # utf-8-sig drops the BOM (urls_to_check.txt is saved with one) while decoding
+    with open(URL_FILE, 'r', encoding='utf-8-sig') as f:
+        urls_to_process = [line.strip() for line in f if line.strip() and not line.startswith('#')]
 
     if not urls_to_process:
-        logging.info("فایل URL ها خالی است یا فقط شامل کامنت است.")
-        with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f: json.dump([], f)
+        logger.info("فایل URL ها خالی است یا فقط شامل کامنت است.")
+        write_json_file(OUTPUT_JSON_FILE, [])
         if os.getenv('GITHUB_OUTPUT'):
             with open(GITHUB_OUTPUT_FILE, 'a', encoding='utf-8') as gh_output: gh_output.write(f"updates_count=0\n")
         return
 
     tracker_data = load_tracker()
-    all_updates_found = []
+    page_cache = load_page_cache()
+    new_tracker_data_for_save = tracker_data.copy()
+    num_updates = 0
     
-    for page_url in urls_to_process: # page_url is now the cleaned version
-        logging.info(f"\n--- شروع بررسی URL: {page_url} ---")
-        # Pass the cleaned page_url to Selenium function
-        page_content = get_page_source_with_selenium(page_url, wait_for_class="downloadbox") 
-        
-        if not page_content:
-            logging.error(f"محتوای صفحه برای {page_url} با Selenium دریافت نشد. رد شدن...")
-            continue
+    # Drivers are created lazily, only for pages that need Selenium. The pool starts with MAX_DRIVERS
+    # empty slots (None); once they are all taken, further borrowers wait for a driver to come back
+    # instead of starting another Chrome. LIFO hands out warm drivers before unused slots.
+    drivers = []
+    drivers_lock = threading.Lock()
+    driver_pool = queue.LifoQueue(maxsize=MAX_DRIVERS)
+    for _ in range(MAX_DRIVERS):
+        driver_pool.put(None)
+
+    @contextlib.contextmanager
+    def borrow_driver():
+        driver = driver_pool.get()
+        if driver is None:
+            try:
+                driver = make_driver()
+            except BaseException:
+                driver_pool.put(None)
+                raise
+            with drivers_lock:
+                drivers.append(driver)
         try:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            # Assuming only farsroid.com URLs are processed this way for now
-            if "farsroid.com" in page_url.lower(): 
-                updates_on_page = scrape_farsroid_page(page_url, soup, tracker_data)
-                all_updates_found.extend(updates_on_page)
+            yield driver
+        finally:
+            try:
+                reset_driver(driver)
+            except Exception as e: # A driver that can't be reset is dropped and its slot freed
+                logger.warning(f"بازنشانی درایور Selenium ناموفق بود، درایور کنار گذاشته می شود: {e}")
+                with drivers_lock:
+                    drivers.remove(driver)
+                try: driver.quit()
+                except Exception: pass
+                driver_pool.put(None)
             else:
-                logging.warning(f"خراش دهنده برای {page_url} پیاده سازی نشده است.")
-        except Exception as e:
-            logging.error(f"خطا هنگام پردازش محتوای دریافت شده از Selenium برای {page_url}: {e}", exc_info=True)
-        logging.info(f"--- پایان بررسی URL: {page_url} ---")
+                driver_pool.put(driver)
 
-    new_tracker_data_for_save = tracker_data.copy()
-    for update_item in all_updates_found:
-        new_tracker_data_for_save[update_item["tracking_id"]] = update_item["current_version_for_tracking"]
-
-    with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_updates_found, f, ensure_ascii=False, indent=2)
+    # Updates are streamed to the output file page by page instead of being collected in one list
+    with json_array_writer(OUTPUT_JSON_FILE) as write_update:
+        try:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(urls_to_process))) as executor:
+                # map() yields in input order, so results are merged deterministically on this thread
+                for updates_on_page in executor.map(lambda page_url: process_url(page_url, tracker_data, borrow_driver, page_cache), urls_to_process):
+                    for update_item in updates_on_page:
+                        write_update(update_item)
+                        new_tracker_data_for_save[update_item["tracking_id"]] = update_item["current_version_for_tracking"]
+                        num_updates += 1
+        finally:
+            for driver in drivers:
+                driver.quit()
+    save_page_cache(page_cache, set(urls_to_process))
     
-    try:
-        with open(TRACKING_FILE, 'w', encoding='utf-8') as f:
-            json.dump(new_tracker_data_for_save, f, ensure_ascii=False, indent=2)
-        logging.info(f"فایل ردیاب {TRACKING_FILE} با موفقیت بروزرسانی شد.")
-    except Exception as e:
-        logging.error(f"خطا در ذخیره فایل ردیاب {TRACKING_FILE}: {e}")
+    if new_tracker_data_for_save == tracker_data:
+        logger.info(f"تغییری در ردیاب نیست. فایل {TRACKING_FILE} بازنویسی نمی شود.")
+    else:
+        try:
+            write_json_file(TRACKING_FILE, new_tracker_data_for_save)
+            logger.info(f"فایل ردیاب {TRACKING_FILE} با موفقیت بروزرسانی شد.")
+        except Exception as e:
+            logger.error(f"خطا در ذخیره فایل ردیاب {TRACKING_FILE}: {e}")
 
-    num_updates = len(all_updates_found)
     if os.getenv('GITHUB_OUTPUT'): 
         with open(GITHUB_OUTPUT_FILE, 'a', encoding='utf-8') as gh_output:
             gh_output.write(f"updates_count={num_updates}\n")
-    logging.info(f"\nخلاصه: {num_updates} آپدیت پیدا شد. جزئیات در {OUTPUT_JSON_FILE}")
+    logger.info(f"\nخلاصه: {num_updates} آپدیت پیدا شد. جزئیات در {OUTPUT_JSON_FILE}")
 
 if __name__ == "__main__":
     main()